@@ -0,0 +1,65 @@
+"""Intraday aggregation benchmark
+
+Folds a long synthetic 1-minute series into a rolling window and reports the
+cost per bar and the window's memory footprint, which stays flat as the
+session grows.
+
+Usage: python benchmarks/intraday_update.py [--bars 1000000] [--window 375]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from intraday import RollingBars  # noqa: E402
+
+
+def synthetic_bars(count, price=24000.0):
+    for i in range(count):
+        open_ = price
+        price *= math.exp(random.gauss(0, 0.0008))
+        high = max(open_, price) + random.random() * 5
+        low = min(open_, price) - random.random() * 5
+        yield (i * 60, open_, high, low, price, random.randint(0, 5000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bars', type=int, default=1_000_000)
+    parser.add_argument('--window', type=int, default=375)
+    args = parser.parse_args()
+
+    bars = list(synthetic_bars(args.bars))
+    window = RollingBars(args.window)
+    checkpoints = {args.bars // 10 * i for i in range(1, 11)}
+
+    tracemalloc.start()
+    for i, bar in enumerate(bars, 1):
+        window.add(*bar)
+        if i in checkpoints:
+            current, _ = tracemalloc.get_traced_memory()
+            print(f"{i:>10} bars: {current / 1024:8.1f} KB traced")
+    tracemalloc.stop()
+
+    # Time folding without tracemalloc overhead
+    window = RollingBars(args.window)
+    start = time.perf_counter()
+    for bar in bars:
+        window.add(*bar)
+    elapsed = time.perf_counter() - start
+
+    snapshot_start = time.perf_counter()
+    snapshot = window.snapshot()
+    snapshot_elapsed = time.perf_counter() - snapshot_start
+
+    print(f"add(): {elapsed / args.bars * 1e6:.2f} us per bar, snapshot(): {snapshot_elapsed * 1e6:.2f} us")
+    print(snapshot)
+
+
+if __name__ == '__main__':
+    main()
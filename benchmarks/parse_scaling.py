@@ -0,0 +1,75 @@
+"""Parse-stage scaling benchmark
+
+Parses synthetic source pages with 1..N extractor processes and reports
+throughput and speedup over in-process parsing.
+
+Usage: python benchmarks/parse_scaling.py [--jobs 48] [--rows 2000] [--max-workers N]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from parsers import parse_source, warm_up_worker  # noqa: E402
+
+
+def make_pages(rows):
+    """Build synthetic pages shaped like the real sources"""
+    table = ''.join(f"<tr><td>Metric {i}</td><td>{1000 + i}.{i % 100:02d}</td></tr>" for i in range(rows))
+    spans = ''.join(f"<div><span>{20000 + i}.{i % 100:02d}</span><p>{i % 100}</p></div>" for i in range(rows))
+    screener = f"<html><body><table><tr><th>Current Price</th><td>24,512.35</td></tr>{table}</table></body></html>"
+    trendlyne = f"<html><body>{spans}<span>22.41</span></body></html>"
+    finlive = f"<html><body>{spans}<p>NIFTY 50 PE is 22.41</p></body></html>"
+    goodreturns = f"<html><body>{spans}<p>Market Mood Index 57</p></body></html>"
+    return [
+        ('screener', screener.encode()),
+        ('trendlyne', trendlyne.encode()),
+        ('finlive', finlive.encode()),
+        ('goodreturns', goodreturns.encode()),
+    ]
+
+
+def run_inline(jobs):
+    start = time.perf_counter()
+    for name, content in jobs:
+        parse_source(name, content)
+    return time.perf_counter() - start
+
+
+def run_pool(jobs, workers):
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context('spawn'),
+                             initializer=warm_up_worker) as pool:
+        # Warm every worker before timing so start-up cost is excluded
+        list(pool.map(parse_source, *zip(*jobs[:workers])))
+        start = time.perf_counter()
+        list(pool.map(parse_source, *zip(*jobs)))
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=48)
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    pages = make_pages(args.rows)
+    jobs = [pages[i % len(pages)] for i in range(args.jobs)]
+    page_kb = sum(len(content) for _, content in pages) / len(pages) / 1024
+    print(f"{args.jobs} jobs, ~{page_kb:.0f} KB per page")
+
+    baseline = run_inline(jobs)
+    print(f"{'in-process':>12}: {baseline:7.3f}s  {args.jobs / baseline:7.1f} pages/s  1.00x")
+
+    for workers in range(1, args.max_workers + 1):
+        elapsed = run_pool(jobs, workers)
+        print(f"{workers:>4} workers: {elapsed:7.3f}s  {args.jobs / elapsed:7.1f} pages/s  {baseline / elapsed:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
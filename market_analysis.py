@@ -6,6 +6,9 @@ from datetime import datetime
 import pytz
 import traceback
 
+# Bound every HTTP call so a hung connection cannot stall the job
+REQUEST_TIMEOUT = 10
+
 def get_nifty_data():
     try:
         print("Fetching Nifty data from screener.in...")
@@ -19,7 +22,7 @@ def get_nifty_data():
         }
         
         session = requests.Session()
-        response = session.get(url, headers=headers)
+        response = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
         if response.status_code != 200:
             print(f"Error fetching Nifty data. Status code: {response.status_code}")
             print(f"Response content: {response.text[:500]}")  # Print first 500 chars of response
@@ -83,7 +86,7 @@ def get_mmi_data():
         }
         
         session = requests.Session()
-        response = session.get(url, headers=headers)
+        response = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
         if response.status_code != 200:
             print(f"Error fetching MMI data. Status code: {response.status_code}")
             return "N/A"
@@ -204,7 +207,7 @@ def send_telegram_message(message):
             "parse_mode": "HTML"
         }
         
-        response = requests.post(url, data=data)
+        response = requests.post(url, data=data, timeout=REQUEST_TIMEOUT)
         if response.status_code != 200:
             print(f"Error sending message. Status code: {response.status_code}")
             print(f"Response: {response.text}")
@@ -0,0 +1,95 @@
+import math
+from statistics import median
+
+# Tolerance band per field: (width, relative), the widest spread between agreeing values
+# relative bands are a fraction of the value, absolute ones are in the field's units
+TOLERANCES = {
+    'price': (0.01, True),
+    'pe_ratio': (0.05, True),
+    'value': (5, False),
+}
+
+
+def to_number(value):
+    """Parse a scraped value, returning None for 'N/A', 'Error' and other junk"""
+    if value is None or value in ['N/A', 'Error']:
+        return None
+    try:
+        number = float(str(value).replace(',', ''))
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _limit(field, center):
+    """Widest allowed spread between agreeing values near center"""
+    width, relative = TOLERANCES[field]
+    return width * abs(center) if relative else width
+
+
+def _clusters(field, values):
+    """Maximal groups of values whose pairwise spread is within the tolerance band"""
+    ordered = sorted(values, key=lambda entry: entry[1])
+    clusters = []
+    for i, (_, low) in enumerate(ordered):
+        j = i
+        while j + 1 < len(ordered) and ordered[j + 1][1] - low <= _limit(field, low):
+            j += 1
+        clusters.append(ordered[i:j + 1])
+    return clusters
+
+
+def consensus(field, candidates, quorum, reference=None):
+    """Robust consensus over (source, raw value) pairs given in preference order
+
+    Values agree when every pair of them is within the field's tolerance band.
+    The largest agreeing group wins; ties go to the group closest to reference
+    (e.g. a fresh last-known-good value), then to the most preferred source.
+    Returns the agreed value (median of the winning group, None if nothing was
+    valid) with agreement stats; 'reached' is set once quorum values agree.
+    """
+    values = []
+    for source, raw in candidates:
+        number = to_number(raw)
+        if number is not None:
+            values.append((source, number))
+
+    stats = {
+        'value': None,
+        'sources': len(values),
+        'agreeing': [],
+        'rejected': {},
+        'quorum': quorum,
+        'reached': False,
+    }
+    if not values:
+        return stats
+
+    rank = {source: i for i, (source, _) in enumerate(values)}
+
+    def preference(cluster):
+        center = median(number for _, number in cluster)
+        distance = abs(center - reference) if reference is not None else 0.0
+        return (-len(cluster), distance, min(rank[source] for source, _ in cluster))
+
+    agreeing = min(_clusters(field, values), key=preference)
+    agreeing_sources = {source for source, _ in agreeing}
+    stats['value'] = median(number for _, number in agreeing)
+    stats['agreeing'] = [source for source, _ in values if source in agreeing_sources]
+    stats['rejected'] = {source: number for source, number in values if source not in agreeing_sources}
+    stats['reached'] = len(agreeing) >= quorum
+    return stats
+
+
+def describe(label, stats):
+    """One-line agreement summary for the debug message"""
+    if not stats['sources']:
+        return f"{label}: no valid sources"
+
+    line = f"{label}: {len(stats['agreeing'])}/{stats['sources']} agree ({', '.join(stats['agreeing'])})"
+    if not stats['reached']:
+        line += f", quorum {stats['quorum']} not reached"
+    if stats['rejected']:
+        rejected = ', '.join(f"{source}={number:g}" for source, number in stats['rejected'].items())
+        line += f", rejected {rejected}"
+    return line
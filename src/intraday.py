@@ -0,0 +1,170 @@
+import math
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+# NSE cash session: 09:15-15:30 IST, 375 one-minute bars
+SESSION_BARS = 375
+TRADING_DAYS = 252
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+class RollingBars:
+    """Fixed-size ring buffer of 1-minute bars with O(1) rolling aggregates
+
+    Every aggregate (OHLC, VWAP, return, volatility) is maintained incrementally
+    as bars enter and leave the window, so memory is bounded by the window size
+    and folding a bar never rescans the series.
+    """
+
+    def __init__(self, size=SESSION_BARS):
+        self.size = size
+        self.timestamps = [0] * size
+        self.opens = [0.0] * size
+        self.closes = [0.0] * size
+        self.volumes = [0.0] * size
+        self.pvs = [0.0] * size
+        self.returns = [None] * size
+        self.count = 0
+        self.seq = 0  # total bars ever folded; slot = seq % size
+        self.last_timestamp = None
+
+        # Running sums over the window
+        self.sum_pv = 0.0
+        self.sum_v = 0.0
+        self.sum_r = 0.0
+        self.sum_r2 = 0.0
+        self.n_returns = 0
+
+        # Monotonic deques of (seq, value) for rolling high/low
+        self.highs = deque()
+        self.lows = deque()
+
+    def add(self, timestamp, open_, high, low, close, volume):
+        """Fold one completed bar into the window"""
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            return False
+
+        slot = self.seq % self.size
+        if self.count == self.size:
+            self._evict(slot)
+        else:
+            self.count += 1
+
+        previous_close = self.closes[(self.seq - 1) % self.size] if self.seq else None
+        bar_return = math.log(close / previous_close) if previous_close else None
+        volume = volume or 0.0
+        pv = (high + low + close) / 3 * volume
+
+        self.timestamps[slot] = timestamp
+        self.opens[slot] = open_
+        self.closes[slot] = close
+        self.volumes[slot] = volume
+        self.pvs[slot] = pv
+        self.returns[slot] = bar_return
+
+        self.sum_pv += pv
+        self.sum_v += volume
+        if bar_return is not None:
+            self.sum_r += bar_return
+            self.sum_r2 += bar_return * bar_return
+            self.n_returns += 1
+
+        while self.highs and self.highs[-1][1] <= high:
+            self.highs.pop()
+        self.highs.append((self.seq, high))
+        while self.lows and self.lows[-1][1] >= low:
+            self.lows.pop()
+        self.lows.append((self.seq, low))
+
+        self.seq += 1
+        self.last_timestamp = timestamp
+        return True
+
+    def _evict(self, slot):
+        """Remove the oldest bar (stored in slot) from the running aggregates"""
+        self.sum_pv -= self.pvs[slot]
+        self.sum_v -= self.volumes[slot]
+
+        bar_return = self.returns[slot]
+        if bar_return is not None:
+            self.sum_r -= bar_return
+            self.sum_r2 -= bar_return * bar_return
+            self.n_returns -= 1
+
+        oldest = self.seq - self.size
+        if self.highs and self.highs[0][0] == oldest:
+            self.highs.popleft()
+        if self.lows and self.lows[0][0] == oldest:
+            self.lows.popleft()
+
+    def snapshot(self):
+        """Current rolling aggregates, or None before the first bar"""
+        if not self.count:
+            return None
+
+        first = (self.seq - self.count) % self.size
+        last = (self.seq - 1) % self.size
+        open_ = self.opens[first]
+        close = self.closes[last]
+
+        volatility = None
+        if self.n_returns > 1:
+            mean = self.sum_r / self.n_returns
+            variance = max(self.sum_r2 / self.n_returns - mean * mean, 0.0)
+            volatility = math.sqrt(variance * self.n_returns / (self.n_returns - 1))
+
+        return {
+            'bars': self.count,
+            'open': open_,
+            'high': self.highs[0][1],
+            'low': self.lows[0][1],
+            'close': close,
+            'vwap': self.sum_pv / self.sum_v if self.sum_v > 0 else None,
+            'return_pct': (close / open_ - 1) * 100 if open_ else None,
+            'volatility_pct': volatility * 100 if volatility is not None else None,
+            'annualized_volatility_pct': (
+                volatility * math.sqrt(SESSION_BARS * TRADING_DAYS) * 100 if volatility is not None else None
+            ),
+        }
+
+
+def _session_date(timestamp):
+    """IST trading date of a bar timestamp"""
+    return datetime.fromtimestamp(timestamp, IST).date()
+
+
+class IntradayAggregator:
+    """Rolling bar windows keyed by symbol"""
+
+    def __init__(self, size=SESSION_BARS):
+        self.size = size
+        self.windows = {}
+
+    def update(self, symbol, bars):
+        """Fold (timestamp, open, high, low, close, volume) bars, oldest first; returns bars added
+
+        Polls return the whole session so far, so only the tail newer than the
+        last folded bar is visited. The window starts afresh when the IST
+        session date changes.
+        """
+        window = self.windows.get(symbol)
+        if window is not None and bars and window.last_timestamp is not None:
+            if _session_date(bars[-1][0]) != _session_date(window.last_timestamp):
+                window = None
+        if window is None:
+            window = self.windows[symbol] = RollingBars(self.size)
+
+        start = len(bars)
+        while start and (window.last_timestamp is None or bars[start - 1][0] > window.last_timestamp):
+            start -= 1
+
+        added = 0
+        for bar in bars[start:]:
+            if window.add(*bar):
+                added += 1
+        return added
+
+    def snapshot(self, symbol):
+        """Rolling aggregates for a symbol, or None if no bars were folded yet"""
+        window = self.windows.get(symbol)
+        return window.snapshot() if window else None
@@ -1,17 +1,94 @@
 import requests
-from bs4 import BeautifulSoup
 import json
 import os
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import time
-import re
+import sys
+import difflib
+import hashlib
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from consensus import TOLERANCES, consensus, describe, to_number
+from intraday import SESSION_BARS, IntradayAggregator
+from parsers import SOURCES, error_result, parse_source, warm_up_worker
+
+# Persisted bot state (Telegram message ids, rendered reports, metrics)
+STATE_FILE = os.environ.get(
+    'MARKET_BOT_STATE_FILE',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.market_bot_state.json')
+)
+METRICS_RETENTION_DAYS = 30
+
+# Fetch/parse pipeline settings
+NIFTY_SOURCES = ['finlive', 'trendlyne', 'screener', 'yahoo']
+INTRADAY_NIFTY_SOURCES = ['finlive', 'trendlyne', 'screener', 'yahoo_intraday']
+MMI_SOURCES = ['tickertape', 'goodreturns']
+FETCH_WORKERS = int(os.environ.get('FETCH_WORKERS', 6))
+PARSE_WORKERS = int(os.environ.get('PARSE_WORKERS', os.cpu_count() or 1))
+PARSE_QUEUE_SIZE = int(os.environ.get('PARSE_QUEUE_SIZE', 4))
+PARSE_INLINE_THRESHOLD = 32 * 1024  # pages smaller than this are parsed in-process
+FETCH_CHUNK_SIZE = 16 * 1024  # downloads check for cancellation between chunks
+
+# Cross-source consensus: a field is settled once this many sources agree
+CONSENSUS_QUORUM = int(os.environ.get('CONSENSUS_QUORUM', 2))
+
+# Per-run latency budget: the report goes out within RUN_DEADLINE_SECONDS,
+# falling back to last-known-good values for anything not fetched in time
+RUN_DEADLINE_SECONDS = float(os.environ.get('RUN_DEADLINE_SECONDS', 10))
+SEND_RESERVE_SECONDS = float(os.environ.get('SEND_RESERVE_SECONDS', 2))
+RETRY_DELAY_SECONDS = 5
+TELEGRAM_TIMEOUT_SECONDS = 10
+LAST_KNOWN_GOOD_MAX_AGE = int(os.environ.get('LAST_KNOWN_GOOD_MAX_AGE', 7 * 24 * 3600))
+# Last-known-good values younger than this break ties between disagreeing sources
+CONSENSUS_REFERENCE_MAX_AGE = 2 * 24 * 3600
+LAST_KNOWN_GOOD_KEYS = {'price': 'price', 'pe_ratio': 'pe_ratio', 'value': 'mmi'}
+
+# Intraday mode settings
+IST = timezone(timedelta(hours=5, minutes=30))
+MARKET_OPEN_IST = (9, 15)
+MARKET_CLOSE_IST = (15, 30)
+# Polls after the open with no bars for today mean the exchange is on holiday
+HOLIDAY_GRACE_MINUTES = 10
+INTRADAY_POLL_SECONDS = int(os.environ.get('INTRADAY_POLL_SECONDS', 60))
+INTRADAY_WINDOW_BARS = int(os.environ.get('INTRADAY_WINDOW_BARS', SESSION_BARS))
+
+class Deadline:
+    """Monotonic time budget shared by every stage of a run"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
 
 class MarketDataScraper:
-    def __init__(self):
+    def __init__(self, intraday=False):
+        self.intraday = intraday
+        self.nifty_sources = INTRADAY_NIFTY_SOURCES if intraday else NIFTY_SOURCES
+        self.aggregator = IntradayAggregator(INTRADAY_WINDOW_BARS)
         self.telegram_bot_token = os.environ.get('TELEGRAM_BOT_TOKEN')
         self.telegram_chat_id = os.environ.get('TELEGRAM_CHAT_ID')
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.session = self._new_session()
+        # requests.Session is not thread-safe: each fetch thread borrows an idle
+        # session from this pool and returns it afterwards, keeping connections alive
+        self._idle_sessions = queue.SimpleQueue()
+        self._sessions = [self.session]
+        self.state = self.load_state()
+        self._parse_pool = None
+
+    def _new_session(self):
+        """Create an HTTP session with browser-like headers"""
+        session = requests.Session()
+        session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.5',
@@ -19,263 +96,351 @@ class MarketDataScraper:
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1'
         })
+        return session
 
-    def get_nifty_data_from_finlive(self):
-        """Get NIFTY 50 price and PE from finlive.in"""
+    def _borrow_session(self):
+        """Take an idle session for exclusive use by one fetch thread"""
         try:
-            url = "https://www.finlive.in/page/nifty-50-nifty-pe-ratio"
-            response = self.session.get(url, timeout=15)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Look for specific patterns in the text
-            page_text = soup.get_text()
-            
-            # Extract PE ratio
-            pe_ratio = 'N/A'
-            pe_pattern = r'NIFTY 50 PE is ([\d.]+)'
-            pe_match = re.search(pe_pattern, page_text)
-            if pe_match:
-                pe_ratio = pe_match.group(1)
-            
-            # Try alternative PE patterns
-            if pe_ratio == 'N/A':
-                pe_patterns = [
-                    r'PE.*?(\d+\.\d+)',
-                    r'P/E.*?(\d+\.\d+)',
-                    r'ratio.*?(\d+\.\d+)'
-                ]
-                for pattern in pe_patterns:
-                    match = re.search(pattern, page_text, re.IGNORECASE)
-                    if match:
-                        pe_ratio = match.group(1)
-                        break
-            
-            return {'pe_ratio': pe_ratio, 'source': 'finlive.in'}
-            
+            return self._idle_sessions.get_nowait()
+        except queue.Empty:
+            session = self._new_session()
+            self._sessions.append(session)
+            return session
+
+    def load_state(self):
+        """Load persisted bot state from disk"""
+        try:
+            with open(STATE_FILE, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if not isinstance(state, dict):
+                state = {}
+        except FileNotFoundError:
+            state = {}
         except Exception as e:
-            print(f"Error getting data from finlive: {e}")
-            return {'pe_ratio': 'Error', 'source': 'finlive.in'}
+            print(f"Error loading bot state, starting fresh: {e}")
+            state = {}
+        state.setdefault('telegram', {'chats': {}, 'metrics': {}})
+        state.setdefault('last_known_good', {})
+        return state
 
-    def get_nifty_data_from_trendlyne(self):
-        """Get NIFTY 50 data from Trendlyne"""
+    def save_state(self):
+        """Persist bot state to disk"""
         try:
-            url = "https://trendlyne.com/equity/1887/NIFTY/nifty-50/"
-            response = self.session.get(url, timeout=15)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Look for price and PE data
-            price = 'N/A'
-            pe_ratio = 'N/A'
-            
-            # Try to find price elements
-            price_elements = soup.find_all(['span', 'div', 'td'], text=re.compile(r'[\d,]+\.\d+'))
-            numbers = []
-            
-            for element in price_elements:
-                try:
-                    # Extract clean number
-                    text = element.get_text().strip()
-                    clean_num = re.sub(r'[^\d.]', '', text)
-                    if '.' in clean_num and len(clean_num) > 3:
-                        num = float(clean_num)
-                        numbers.append(num)
-                except:
-                    continue
-            
-            # Heuristic: NIFTY price is usually above 20,000, PE is usually between 15-30
-            for num in numbers:
-                if 20000 <= num <= 30000 and price == 'N/A':
-                    price = str(num)
-                elif 15 <= num <= 35 and pe_ratio == 'N/A':
-                    pe_ratio = str(num)
-            
-            return {'price': price, 'pe_ratio': pe_ratio, 'source': 'trendlyne.com'}
-            
+            tmp_file = f"{STATE_FILE}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_file, STATE_FILE)
         except Exception as e:
-            print(f"Error getting data from trendlyne: {e}")
-            return {'price': 'Error', 'pe_ratio': 'Error', 'source': 'trendlyne.com'}
+            print(f"Error saving bot state: {e}")
 
-    def get_nifty_data_from_screener(self):
-        """Get NIFTY 50 data from Screener.in"""
+    def _get_parse_pool(self):
+        """Lazily start the extractor process pool (None when parsing in-process)"""
+        if PARSE_WORKERS <= 1:
+            return None
+        if self._parse_pool is None:
+            # spawn: workers must not inherit the fetch threads, and warm up once via the initializer
+            self._parse_pool = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=warm_up_worker
+            )
+        return self._parse_pool
+
+    def _discard_parse_pool(self):
+        """Shut down the extractor process pool, if any"""
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown(wait=False, cancel_futures=True)
+            self._parse_pool = None
+
+    def close(self):
+        """Shut down the extractor process pool and HTTP sessions"""
+        self._discard_parse_pool()
+        for session in self._sessions:
+            session.close()
+
+    def _fetch_source(self, name, raw_queue, stop_event, deadline=None, budget=None):
+        """Fetch stage: download raw bytes and hand them to the parse stage"""
+        if stop_event.is_set():
+            return
+
+        config = SOURCES[name]
+        timeout = config['timeout']
+        if deadline is not None:
+            timeout = min(timeout, budget, deadline.remaining())
+        session = self._borrow_session()
         try:
-            url = "https://www.screener.in/company/NIFTY/"
-            response = self.session.get(url, timeout=15)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Look for specific data fields
-            price = 'N/A'
-            pe_ratio = 'N/A'
-            
-            # Try to find data in table rows
-            rows = soup.find_all('tr')
-            for row in rows:
-                cells = row.find_all(['td', 'th'])
-                if len(cells) >= 2:
-                    header = cells[0].get_text().strip().lower()
-                    value = cells[1].get_text().strip()
-                    
-                    if 'price' in header or 'current' in header:
-                        price_match = re.search(r'([\d,]+\.?\d*)', value)
-                        if price_match:
-                            price = price_match.group(1).replace(',', '')
-                    
-                    if 'pe' in header or 'p/e' in header:
-                        pe_match = re.search(r'(\d+\.?\d*)', value)
-                        if pe_match:
-                            pe_ratio = pe_match.group(1)
-            
-            return {'price': price, 'pe_ratio': pe_ratio, 'source': 'screener.in'}
-            
+            if timeout <= 0:
+                raise TimeoutError("run deadline exceeded before fetch started")
+            with session.get(config['url'], timeout=timeout, stream=True) as response:
+                response.raise_for_status()
+                chunks = []
+                for chunk in response.iter_content(FETCH_CHUNK_SIZE):
+                    # Abort the download (dropping its connection) once the run stops
+                    if stop_event.is_set():
+                        return
+                    chunks.append(chunk)
+            item = (name, b''.join(chunks), None)
         except Exception as e:
-            print(f"Error getting data from screener: {e}")
-            return {'price': 'Error', 'pe_ratio': 'Error', 'source': 'screener.in'}
+            item = (name, None, e)
+        finally:
+            self._idle_sessions.put(session)
 
-    def get_mmi_data_from_tickertape(self):
-        """Get MMI data from TickerTape"""
+        # Blocks while the parse stage is saturated (backpressure)
+        while not stop_event.is_set():
+            try:
+                raw_queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _fetch_worker(self, work, raw_queue, stop_event, deadline, budget):
+        """Fetch thread: take sources off the work queue until it is empty or the run stops"""
+        while not stop_event.is_set():
+            try:
+                name = work.get_nowait()
+            except queue.Empty:
+                return
+            self._fetch_source(name, raw_queue, stop_event, deadline, budget)
+
+    def _parse_inline(self, name, content):
+        """Parse stage fallback: run the extractor in this process"""
         try:
-            url = "https://www.tickertape.in/market-mood-index"
-            response = self.session.get(url, timeout=15)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Look for MMI value in various elements
-            mmi_value = 'N/A'
-            
-            # Try to find MMI value in specific elements
-            mmi_elements = soup.find_all(['span', 'div', 'p'], text=re.compile(r'\d+'))
-            
-            for element in mmi_elements:
+            return parse_source(name, content)
+        except Exception as e:
+            print(f"Error parsing data from {SOURCES[name]['source']}: {e}")
+            return error_result(name)
+
+    def _parse_result(self, name, content, future):
+        """Collect a pooled extractor result, re-parsing in-process if the pool broke"""
+        try:
+            return future.result()
+        except BrokenProcessPool as e:
+            print(f"Parse pool failed ({e}), parsing {name} in-process")
+            self._discard_parse_pool()
+            return self._parse_inline(name, content)
+        except Exception as e:
+            print(f"Error parsing data from {SOURCES[name]['source']}: {e}")
+            return error_result(name)
+
+    def iter_source_results(self, names, deadline=None):
+        """Fetch sources concurrently and yield (name, data) as each one is parsed
+
+        Fetch threads push raw bytes into a bounded queue; the consumer hands large
+        pages to the extractor process pool and parses small ones in-process.
+        Closing the generator stops the fetch threads: queued sources are dropped
+        and running downloads abort at their next chunk. The threads are daemons,
+        so a request still waiting for response headers never delays exit.
+        With a deadline, the remaining budget is split across the fetch waves and
+        sources still outstanding when it expires are yielded as errors.
+        """
+        self._get_parse_pool()
+        raw_queue = queue.Queue(maxsize=PARSE_QUEUE_SIZE)
+        stop_event = threading.Event()
+        workers = max(1, min(FETCH_WORKERS, len(names)))
+        budget = None
+        if deadline is not None:
+            waves = -(-len(names) // workers)
+            budget = deadline.remaining() / max(1, waves)
+        work = queue.SimpleQueue()
+        for name in names:
+            work.put(name)
+        for i in range(workers):
+            threading.Thread(
+                target=self._fetch_worker,
+                args=(work, raw_queue, stop_event, deadline, budget),
+                name=f"fetch-{i}",
+                daemon=True
+            ).start()
+        parsing = {}
+        pending = len(names)
+        outstanding = set(names)
+
+        try:
+            while pending:
+                if deadline is not None and deadline.expired():
+                    print(f"Run deadline reached, giving up on: {', '.join(sorted(outstanding))}")
+                    for name in sorted(outstanding):
+                        yield name, error_result(name)
+                    break
+
+                done = [future for future in parsing if future.done()]
+                for future in done:
+                    name, content = parsing.pop(future)
+                    pending -= 1
+                    outstanding.discard(name)
+                    yield name, self._parse_result(name, content, future)
+                if done:
+                    continue
+
+                # Only pull more raw pages while the pool has free slots
+                if len(parsing) >= PARSE_QUEUE_SIZE:
+                    wait(parsing, timeout=deadline.remaining() if deadline else None, return_when=FIRST_COMPLETED)
+                    continue
+
                 try:
-                    text = element.get_text().strip()
-                    # Look for numbers between 0-100
-                    numbers = re.findall(r'\b(\d+)\b', text)
-                    for num in numbers:
-                        value = int(num)
-                        if 0 <= value <= 100:
-                            mmi_value = value
-                            break
-                    if mmi_value != 'N/A':
-                        break
-                except:
+                    name, content, error = raw_queue.get(timeout=0.05)
+                except queue.Empty:
+                    if parsing:
+                        wait(parsing, timeout=0.05, return_when=FIRST_COMPLETED)
                     continue
-            
-            return {'value': mmi_value, 'source': 'tickertape.in'}
-            
+
+                if error is not None:
+                    pending -= 1
+                    outstanding.discard(name)
+                    print(f"Error getting data from {SOURCES[name]['source']}: {error}")
+                    yield name, error_result(name)
+                    continue
+
+                pool = self._parse_pool
+                if pool is not None and len(content) >= PARSE_INLINE_THRESHOLD:
+                    try:
+                        parsing[pool.submit(parse_source, name, content)] = (name, content)
+                        continue
+                    except BrokenProcessPool as e:
+                        # A worker died while the pool was idle
+                        print(f"Parse pool failed ({e}), parsing {name} in-process")
+                        self._discard_parse_pool()
+
+                pending -= 1
+                outstanding.discard(name)
+                yield name, self._parse_inline(name, content)
+        finally:
+            stop_event.set()
+            for future in parsing:
+                future.cancel()
+
+    def _get_source_data(self, name):
+        """Fetch and parse a single source in-process"""
+        config = SOURCES[name]
+        try:
+            response = self.session.get(config['url'], timeout=config['timeout'])
+            response.raise_for_status()
+            return parse_source(name, response.content)
         except Exception as e:
-            print(f"Error getting MMI from tickertape: {e}")
-            return {'value': 'Error', 'source': 'tickertape.in'}
+            print(f"Error getting data from {config['source']}: {e}")
+            return error_result(name)
+
+    def get_nifty_data_from_finlive(self):
+        """Get NIFTY 50 price and PE from finlive.in"""
+        return self._get_source_data('finlive')
+
+    def get_nifty_data_from_trendlyne(self):
+        """Get NIFTY 50 data from Trendlyne"""
+        return self._get_source_data('trendlyne')
+
+    def get_nifty_data_from_screener(self):
+        """Get NIFTY 50 data from Screener.in"""
+        return self._get_source_data('screener')
+
+    def get_mmi_data_from_tickertape(self):
+        """Get MMI data from TickerTape"""
+        return self._get_source_data('tickertape')
 
     def get_mmi_data_from_goodreturns(self):
         """Get MMI data from GoodReturns"""
+        return self._get_source_data('goodreturns')
+
+    def _field_quorum(self, names, field):
+        """Quorum for a field, capped by how many of the sources report it"""
+        providers = sum(1 for name in names if field in SOURCES[name]['fields'])
+        return max(1, min(CONSENSUS_QUORUM, providers))
+
+    def _reference_value(self, field):
+        """Fresh last-known-good value of a field, used to break ties between disagreeing sources"""
+        saved = self.state['last_known_good'].get(LAST_KNOWN_GOOD_KEYS[field])
+        if not saved or time.time() - saved['fetched_at'] > CONSENSUS_REFERENCE_MAX_AGE:
+            return None
+        return to_number(saved['value'])
+
+    def _field_consensus(self, names, results, field):
+        """Consensus for one field over the results of names, in preference order"""
+        candidates = [(SOURCES[name]['source'], results[name].get(field)) for name in names if name in results]
+        return consensus(field, candidates, self._field_quorum(names, field), self._reference_value(field))
+
+    def fetch_sources(self, names, deadline=None):
+        """Fetch sources concurrently, returning as soon as every field reaches quorum
+
+        Sources still in flight at that point are aborted. In intraday mode the
+        chart feed is always awaited since it carries the 1-minute bars.
+        """
+        fields = {field for name in names for field in SOURCES[name]['fields'] if field in TOLERANCES}
+        required = {name for name in names if name == 'yahoo_intraday'}
+        results = {}
+
+        source_results = self.iter_source_results(names, deadline)
         try:
-            url = "https://www.goodreturns.in/market-mood-index.html"
-            response = self.session.get(url, timeout=15)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Look for MMI value
-            mmi_value = 'N/A'
-            
-            # Search for MMI value patterns
-            page_text = soup.get_text()
-            mmi_patterns = [
-                r'MMI.*?(\d+)',
-                r'Market Mood Index.*?(\d+)',
-                r'Index.*?(\d+)',
-                r'current.*?(\d+)'
-            ]
-            
-            for pattern in mmi_patterns:
-                match = re.search(pattern, page_text, re.IGNORECASE)
-                if match:
-                    value = int(match.group(1))
-                    if 0 <= value <= 100:
-                        mmi_value = value
-                        break
-            
-            return {'value': mmi_value, 'source': 'goodreturns.in'}
-            
-        except Exception as e:
-            print(f"Error getting MMI from goodreturns: {e}")
-            return {'value': 'Error', 'source': 'goodreturns.in'}
+            for name, data in source_results:
+                results[name] = data
+                if required - set(results) or len(results) == len(names):
+                    continue
+                if all(self._field_consensus(names, results, field)['reached'] for field in fields):
+                    skipped = [name for name in names if name not in results]
+                    print(f"Quorum reached for {', '.join(sorted(fields))}, aborting: {', '.join(skipped)}")
+                    break
+        finally:
+            source_results.close()
+
+        return results
 
-    def scrape_nifty_pe_data(self):
+    def scrape_nifty_pe_data(self, results=None):
         """Scrape NIFTY 50 PE data from multiple sources"""
         print("Fetching NIFTY 50 data from multiple sources...")
         
-        # Try multiple sources
-        sources = [
-            self.get_nifty_data_from_finlive,
-            self.get_nifty_data_from_trendlyne,
-            self.get_nifty_data_from_screener,
-            self.get_nifty_data_from_api
-        ]
+        # Sources in order of preference
+        sources = self.nifty_sources
+        if results is None:
+            results = self.fetch_sources(sources)
         
-        best_data = {'price': 'N/A', 'pe_ratio': 'N/A', 'source': 'multiple'}
-        
-        for source_func in sources:
-            try:
-                data = source_func()
-                print(f"Data from {data.get('source', 'unknown')}: {data}")
-                
-                # Use the first valid PE ratio found
-                if data.get('pe_ratio') not in ['N/A', 'Error'] and best_data['pe_ratio'] == 'N/A':
-                    best_data['pe_ratio'] = data['pe_ratio']
-                    best_data['source'] = data.get('source', 'unknown')
-                
-                # Use the first valid price found
-                if data.get('price') not in ['N/A', 'Error'] and best_data['price'] == 'N/A':
-                    best_data['price'] = data['price']
-                
-                # If we have both values, we can stop
-                if best_data['price'] != 'N/A' and best_data['pe_ratio'] != 'N/A':
-                    break
-                    
-                time.sleep(2)  # Be respectful to servers
-                
-            except Exception as e:
-                print(f"Error with source {source_func.__name__}: {e}")
+        for name in sources:
+            if name not in results:
                 continue
+            data = results[name]
+            
+            # Fold new 1-minute bars into the rolling intraday window
+            bars = data.pop('bars', None)
+            if bars is not None:
+                added = self.aggregator.update(data['symbol'], bars)
+                print(f"Folded {added} new intraday bars for {data['symbol']}")
+            
+            print(f"Data from {data.get('source', 'unknown')}: {data}")
+        
+        # Cross-check every source instead of trusting the first match
+        price = self._field_consensus(sources, results, 'price')
+        pe_ratio = self._field_consensus(sources, results, 'pe_ratio')
+        
+        best_data = {
+            'price': str(round(price['value'], 2)) if price['value'] is not None else 'N/A',
+            'pe_ratio': str(round(pe_ratio['value'], 2)) if pe_ratio['value'] is not None else 'N/A',
+            'source': ', '.join(pe_ratio['agreeing'] or price['agreeing']) or 'multiple',
+            'consensus': {'price': price, 'pe_ratio': pe_ratio}
+        }
+        
+        symbol = next((results[name]['symbol'] for name in sources if 'symbol' in results.get(name, {})), None)
+        if symbol:
+            best_data['intraday'] = self.aggregator.snapshot(symbol)
         
         return best_data
 
-    def scrape_mmi_data(self):
+    def scrape_mmi_data(self, results=None):
         """Scrape Market Mood Index from multiple sources"""
         print("Fetching MMI data from multiple sources...")
         
-        # Try multiple sources
-        sources = [
-            self.get_mmi_data_from_tickertape,
-            self.get_mmi_data_from_goodreturns
-        ]
+        # Sources in order of preference
+        sources = MMI_SOURCES
+        if results is None:
+            results = self.fetch_sources(sources)
         
-        best_data = {'value': 'N/A', 'status': 'N/A', 'source': 'multiple'}
+        for name in sources:
+            if name in results:
+                print(f"MMI data from {results[name].get('source', 'unknown')}: {results[name]}")
         
-        for source_func in sources:
-            try:
-                data = source_func()
-                print(f"MMI data from {data.get('source', 'unknown')}: {data}")
-                
-                # Use the first valid MMI value found
-                if data.get('value') not in ['N/A', 'Error'] and best_data['value'] == 'N/A':
-                    best_data['value'] = data['value']
-                    best_data['status'] = self.get_mmi_status(data['value'])
-                    best_data['source'] = data.get('source', 'unknown')
-                    break
-                    
-                time.sleep(2)  # Be respectful to servers
-                
-            except Exception as e:
-                print(f"Error with MMI source {source_func.__name__}: {e}")
-                continue
+        mmi = self._field_consensus(sources, results, 'value')
+        
+        best_data = {'value': 'N/A', 'status': 'N/A', 'source': 'multiple', 'consensus': {'value': mmi}}
+        if mmi['value'] is not None:
+            best_data['value'] = int(round(mmi['value']))
+            best_data['status'] = self.get_mmi_status(best_data['value'])
+            best_data['source'] = ', '.join(mmi['agreeing'])
         
         return best_data
 
@@ -345,29 +510,7 @@ class MarketDataScraper:
 
     def get_nifty_data_from_api(self):
         """Get NIFTY 50 data from Yahoo Finance API (free)"""
-        try:
-            # Yahoo Finance API for NIFTY 50
-            url = "https://query1.finance.yahoo.com/v8/finance/chart/^NSEI"
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            if 'chart' in data and 'result' in data['chart'] and data['chart']['result']:
-                result = data['chart']['result'][0]
-                
-                # Get current price
-                current_price = 'N/A'
-                if 'meta' in result and 'regularMarketPrice' in result['meta']:
-                    current_price = str(round(result['meta']['regularMarketPrice'], 2))
-                
-                return {'price': current_price, 'pe_ratio': 'N/A', 'source': 'Yahoo Finance API'}
-            
-            return {'price': 'N/A', 'pe_ratio': 'N/A', 'source': 'Yahoo Finance API'}
-            
-        except Exception as e:
-            print(f"Error getting data from Yahoo Finance API: {e}")
-            return {'price': 'Error', 'pe_ratio': 'Error', 'source': 'Yahoo Finance API'}
+        return self._get_source_data('yahoo')
 
     def format_message(self, nifty_data, mmi_data):
         """Format the complete message for Telegram"""
@@ -379,16 +522,25 @@ class MarketDataScraper:
         nifty_source = nifty_data.get('source', 'unknown')
         mmi_source = mmi_data.get('source', 'unknown')
         
-        message = f"""📊 **Daily Market Report**
+        intraday_section = self.format_intraday(nifty_data.get('intraday'))
+        
+        if self.intraday:
+            title = "Intraday Market Report"
+            schedule = f"Updated every {INTRADAY_POLL_SECONDS // 60 or 1} min during market hours (09:15-15:30 IST)"
+        else:
+            title = "Daily Market Report"
+            schedule = "Auto-updated daily at 9:30 AM IST"
+        
+        message = f"""📊 **{title}**
 📅 {current_time}
 
 **NIFTY 50 Data:**
-💰 Price: {nifty_data['price']}
-📊 PE Ratio: {nifty_data['pe_ratio']}
+💰 Price: {nifty_data['price']}{self._stale_note(nifty_data, 'price')}
+📊 PE Ratio: {nifty_data['pe_ratio']}{self._stale_note(nifty_data, 'pe_ratio')}
 📍 Source: {nifty_source}
-
+{intraday_section}
 **Market Mood Index:**
-🎯 MMI Value: {mmi_data['value']}
+🎯 MMI Value: {mmi_data['value']}{self._stale_note(mmi_data, 'value')}
 🔮 Status: {mmi_data['status']}
 📍 Source: {mmi_source}
 
@@ -400,25 +552,77 @@ class MarketDataScraper:
 
 **Data Status:**
 ✅ Successfully fetched from multiple reliable sources
-🔄 Auto-updated daily at 9:30 AM IST
+🔄 {schedule}
 
 **Disclaimer:** This is automated analysis for educational purposes. Please consult financial advisor for investment decisions.
 """
         
         return message
 
-    def send_telegram_message(self, message):
+    def format_intraday(self, intraday):
+        """Format rolling intraday aggregates as a report section"""
+        if not intraday:
+            return ''
+
+        def fmt(value, spec):
+            return 'N/A' if value is None else format(value, spec)
+
+        # Yahoo reports zero volume for indices such as ^NSEI, leaving VWAP undefined
+        vwap_line = f"⚖️ VWAP: {intraday['vwap']:.2f}{chr(10)}" if intraday['vwap'] is not None else ''
+
+        return f"""
+**Intraday ({intraday['bars']} min):**
+🕯️ O/H/L/C: {intraday['open']:.2f} / {intraday['high']:.2f} / {intraday['low']:.2f} / {intraday['close']:.2f}
+{vwap_line}📈 Return: {fmt(intraday['return_pct'], '+.2f')}%
+🌊 Volatility: {fmt(intraday['volatility_pct'], '.3f')}% per min ({fmt(intraday['annualized_volatility_pct'], '.1f')}% ann.)
+"""
+
+    def _call_telegram(self, method, data, deadline=None):
+        """Call a Telegram Bot API method and return its result, within deadline if given"""
+        timeout = TELEGRAM_TIMEOUT_SECONDS
+        if deadline is not None:
+            timeout = min(timeout, deadline.remaining())
+            if timeout <= 0:
+                raise TimeoutError(f"{method} skipped: run deadline exceeded")
+        url = f"https://api.telegram.org/bot{self.telegram_bot_token}/{method}"
+        response = requests.post(url, data=data, timeout=timeout)
+        self._record_telegram_metric('api_calls')
+
+        try:
+            payload = response.json()
+        except ValueError:
+            response.raise_for_status()
+            raise
+
+        if not payload.get('ok'):
+            raise RuntimeError(f"{method} failed: {payload.get('description', response.status_code)}")
+
+        return payload.get('result')
+
+    def _record_telegram_metric(self, name, count=1):
+        """Increment a per-day Telegram metric"""
+        metrics = self.state['telegram'].setdefault('metrics', {})
+        today = datetime.now(IST).strftime('%Y-%m-%d')
+        day = metrics.setdefault(today, {'api_calls': 0, 'sent': 0, 'edited': 0, 'skipped': 0, 'calls_saved': 0})
+        day[name] = day.get(name, 0) + count
+
+        # Keep the state file bounded
+        cutoff = (datetime.now(IST) - timedelta(days=METRICS_RETENTION_DAYS)).strftime('%Y-%m-%d')
+        for old_day in [d for d in metrics if d < cutoff]:
+            del metrics[old_day]
+
+    def _report_fingerprint(self, message):
+        """Strip parts of the report that change on every run (timestamp line)"""
+        return '\n'.join(line for line in message.splitlines() if not line.startswith('📅'))
+
+    def send_telegram_message(self, message, deadline=None):
         """Send message to Telegram"""
         try:
-            url = f"https://api.telegram.org/bot{self.telegram_bot_token}/sendMessage"
-            data = {
+            self._call_telegram('sendMessage', {
                 'chat_id': self.telegram_chat_id,
                 'text': message,
                 'parse_mode': 'Markdown'
-            }
-            
-            response = requests.post(url, data=data, timeout=10)
-            response.raise_for_status()
+            }, deadline)
             
             print("Message sent successfully!")
             return True
@@ -427,20 +631,171 @@ class MarketDataScraper:
             print(f"Error sending Telegram message: {e}")
             return False
 
+    def send_telegram_report(self, message, band, deadline=None):
+        """Send the market report, updating the pinned report in place when possible
+
+        The last rendered report is tracked per chat. Within one IST trading day, if
+        nothing visible changed no API call is made and if the MMI band is unchanged
+        the pinned message is edited. A new day, a band change or a failed edit posts
+        a fresh message, so the daily report always notifies subscribers. Every call
+        is bounded by deadline; pinning is skipped once it is used up.
+        """
+        chat_state = self.state['telegram']['chats'].setdefault(str(self.telegram_chat_id), {})
+        fingerprint = self._report_fingerprint(message)
+        digest = hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()
+        today = datetime.now(IST).strftime('%Y-%m-%d')
+        message_id = chat_state.get('message_id')
+        if message_id and chat_state.get('date') != today:
+            print(f"Pinned report is from {chat_state.get('date')}, sending a new report")
+            message_id = None
+
+        try:
+            if message_id and chat_state.get('band') == band:
+                if chat_state.get('hash') == digest:
+                    print("Report unchanged, skipping Telegram update")
+                    self._record_telegram_metric('skipped')
+                    self._record_telegram_metric('calls_saved')
+                    return True
+
+                diff = difflib.ndiff(chat_state.get('text', '').splitlines(), fingerprint.splitlines())
+                changed_lines = sum(1 for line in diff if line.startswith(('+ ', '- ')))
+                print(f"Report changed ({changed_lines} lines), editing message {message_id}")
+
+                try:
+                    self._call_telegram('editMessageText', {
+                        'chat_id': self.telegram_chat_id,
+                        'message_id': message_id,
+                        'text': message,
+                        'parse_mode': 'Markdown'
+                    }, deadline)
+                    self._record_telegram_metric('edited')
+                    chat_state.update({'text': fingerprint, 'hash': digest})
+                    print("Message edited successfully!")
+                    return True
+                except Exception as e:
+                    if 'message is not modified' in str(e):
+                        chat_state.update({'text': fingerprint, 'hash': digest})
+                        return True
+                    print(f"Error editing Telegram message, sending a new one: {e}")
+            elif message_id:
+                print(f"MMI band changed ({chat_state.get('band')} -> {band}), sending a new report")
+
+            result = self._call_telegram('sendMessage', {
+                'chat_id': self.telegram_chat_id,
+                'text': message,
+                'parse_mode': 'Markdown'
+            }, deadline)
+            self._record_telegram_metric('sent')
+            chat_state.update({
+                'message_id': result['message_id'],
+                'date': today,
+                'band': band,
+                'text': fingerprint,
+                'hash': digest
+            })
+            print("Message sent successfully!")
+
+            if deadline is not None and deadline.expired():
+                print("Run deadline reached, not pinning the report")
+                return True
+
+            try:
+                self._call_telegram('pinChatMessage', {
+                    'chat_id': self.telegram_chat_id,
+                    'message_id': result['message_id'],
+                    'disable_notification': True
+                }, deadline)
+            except Exception as e:
+                print(f"Error pinning Telegram message: {e}")
+
+            return True
+
+        except Exception as e:
+            print(f"Error sending Telegram report: {e}")
+            return False
+
+        finally:
+            today = datetime.now(IST).strftime('%Y-%m-%d')
+            saved = self.state['telegram']['metrics'].get(today, {}).get('calls_saved', 0)
+            print(f"Telegram API calls saved today: {saved}")
+            self.save_state()
+
+    def _format_age(self, seconds):
+        """Human-readable age, e.g. 45s, 12m, 3h, 2d"""
+        seconds = int(seconds)
+        if seconds < 60:
+            return f"{seconds}s"
+        if seconds < 3600:
+            return f"{seconds // 60}m"
+        if seconds < 86400:
+            return f"{seconds // 3600}h"
+        return f"{seconds // 86400}d"
+
+    def apply_last_known_good(self, nifty_data, mmi_data):
+        """Persist freshly agreed values and fill missing ones from the last-known-good store
+
+        Values published without a quorum are not persisted. Filled fields are
+        listed in the data's 'stale' dict with their age in seconds.
+        """
+        store = self.state['last_known_good']
+        now = time.time()
+        fields = [(nifty_data, 'price'), (nifty_data, 'pe_ratio'), (mmi_data, 'value')]
+
+        for data, field in fields:
+            key = LAST_KNOWN_GOOD_KEYS[field]
+            value = data.get(field, 'N/A')
+            if value not in ['N/A', 'Error']:
+                stats = data.get('consensus', {}).get(field)
+                if stats is not None and not stats['reached']:
+                    print(f"Not saving {key} {value} as last-known-good: sources did not reach quorum")
+                    continue
+                source = ', '.join(stats['agreeing']) if stats else data.get('source', 'unknown')
+                store[key] = {'value': value, 'source': source, 'fetched_at': now}
+                continue
+
+            saved = store.get(key)
+            if not saved or now - saved['fetched_at'] > LAST_KNOWN_GOOD_MAX_AGE:
+                continue
+
+            age = now - saved['fetched_at']
+            data[field] = saved['value']
+            data.setdefault('stale', {})[field] = age
+            print(f"Using last-known-good {key} {saved['value']} from {saved['source']} ({self._format_age(age)} old)")
+
+        if 'value' in mmi_data.get('stale', {}):
+            mmi_data['status'] = self.get_mmi_status(mmi_data['value'])
+
+        self.save_state()
+
+    def _stale_note(self, data, field):
+        """Suffix marking a value served from the last-known-good store"""
+        age = data.get('stale', {}).get(field)
+        if age is None:
+            return ''
+        return f" (⏳ {self._format_age(age)} old)"
+
     def run(self):
         """Main execution function"""
         print("Starting market data scraping...")
         
-        # Scrape data with retries
+        # The whole run, sending included, fits in the SLA; fetching leaves room to send
+        run_deadline = Deadline(RUN_DEADLINE_SECONDS)
+        deadline = Deadline(max(0.0, RUN_DEADLINE_SECONDS - SEND_RESERVE_SECONDS))
+        nifty_data = {'price': 'N/A', 'pe_ratio': 'N/A', 'source': 'multiple'}
+        mmi_data = {'value': 'N/A', 'status': 'N/A', 'source': 'multiple'}
+        last_error = None
+        
+        # Scrape data with retries while the deadline allows
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                print(f"Attempt {attempt + 1}/{max_retries}")
+                print(f"Attempt {attempt + 1}/{max_retries} ({deadline.remaining():.1f}s left)")
                 
-                # Scrape data
-                nifty_data = self.scrape_nifty_pe_data()
-                time.sleep(3)  # Be respectful to servers
-                mmi_data = self.scrape_mmi_data()
+                # Fetch every source concurrently, then pick values per field
+                results = self.fetch_sources(self.nifty_sources + MMI_SOURCES, deadline)
+                nifty_data = self.scrape_nifty_pe_data(results)
+                mmi_data = self.scrape_mmi_data(results)
+                last_error = None
                 
                 # Check if we got some valid data
                 valid_data = (
@@ -449,45 +804,142 @@ class MarketDataScraper:
                     mmi_data.get('value') not in ['N/A', 'Error']
                 )
                 
-                if valid_data or attempt == max_retries - 1:
-                    # Format and send message
-                    message = self.format_message(nifty_data, mmi_data)
-                    success = self.send_telegram_message(message)
-                    
-                    if success:
-                        print("Daily market report sent successfully!")
-                        
-                        # Send debug info if data is incomplete
-                        if nifty_data.get('price') == 'N/A' or nifty_data.get('pe_ratio') == 'N/A' or mmi_data.get('value') == 'N/A':
-                            debug_message = f"""🔧 **Debug Info**
-NIFTY Price: {nifty_data.get('price')}
-NIFTY PE: {nifty_data.get('pe_ratio')}
-MMI Value: {mmi_data.get('value')}
-
-Some data might be missing due to website changes. The bot will continue to improve data accuracy."""
-                            self.send_telegram_message(debug_message)
-                    else:
-                        print("Failed to send daily market report.")
-                    
+                if valid_data:
                     break
-                else:
-                    print(f"Attempt {attempt + 1} failed, retrying...")
-                    time.sleep(5)
-                    
+                print(f"Attempt {attempt + 1} returned no valid data")
+                
             except Exception as e:
                 print(f"Attempt {attempt + 1} failed with error: {e}")
-                if attempt == max_retries - 1:
-                    # Send error message
-                    error_message = f"""❌ **Market Data Bot Error**
+                last_error = e
+            
+            if attempt == max_retries - 1 or deadline.expired():
+                break
+            print("Retrying...")
+            time.sleep(min(RETRY_DELAY_SECONDS, deadline.remaining() / 2))
+        
+        self.apply_last_known_good(nifty_data, mmi_data)
+        
+        valid_data = (
+            nifty_data.get('price') not in ['N/A', 'Error'] or
+            nifty_data.get('pe_ratio') not in ['N/A', 'Error'] or
+            mmi_data.get('value') not in ['N/A', 'Error']
+        )
+        
+        if last_error is not None and not valid_data:
+            # Send error message
+            error_message = f"""❌ **Market Data Bot Error**
 Unable to fetch complete market data after {max_retries} attempts.
 
-Error: {str(e)[:100]}...
+Error: {str(last_error)[:100]}...
 
 The bot will retry in the next scheduled run."""
-                    self.send_telegram_message(error_message)
+            self.send_telegram_message(error_message, run_deadline)
+            return
+        
+        # Format and send message
+        message = self.format_message(nifty_data, mmi_data)
+        success = self.send_telegram_report(message, mmi_data.get('status'), run_deadline)
+        
+        if success:
+            print("Daily market report sent successfully!")
+            
+            # Send debug info if data is incomplete, stale or sources disagree
+            stale = dict(nifty_data.get('stale', {}))
+            if 'value' in mmi_data.get('stale', {}):
+                stale['mmi'] = mmi_data['stale']['value']
+            agreement = [
+                ('Price', nifty_data.get('consensus', {}).get('price')),
+                ('PE', nifty_data.get('consensus', {}).get('pe_ratio')),
+                ('MMI', mmi_data.get('consensus', {}).get('value')),
+            ]
+            agreement_lines = chr(10).join(describe(label, stats) for label, stats in agreement if stats)
+            print(f"Source agreement:{chr(10)}{agreement_lines or 'No sources fetched'}")
+            disagreement = any(stats['rejected'] or not stats['reached'] for _, stats in agreement if stats)
+            
+            if nifty_data.get('price') == 'N/A' or nifty_data.get('pe_ratio') == 'N/A' or mmi_data.get('value') == 'N/A' or stale or disagreement:
+                stale_fields = ', '.join(f"{field} ({self._format_age(age)} old)" for field, age in stale.items())
+                debug_message = f"""🔧 **Debug Info**
+NIFTY Price: {nifty_data.get('price')}
+NIFTY PE: {nifty_data.get('pe_ratio')}
+MMI Value: {mmi_data.get('value')}
+Last-known-good: {stale_fields or 'none'}
+
+**Source Agreement:**
+{agreement_lines or 'No sources fetched'}
+
+Some data might be missing due to website changes. The bot will continue to improve data accuracy."""
+                if run_deadline.expired():
+                    print("Run deadline reached, not sending debug info")
                 else:
-                    time.sleep(5)
+                    self.send_telegram_message(debug_message, run_deadline)
+        else:
+            print("Failed to send daily market report.")
+
+    def market_closed(self):
+        """Whether the NSE cash session is over for today (IST), or not held at all (weekend)"""
+        now = datetime.now(IST)
+        return now.weekday() >= 5 or (now.hour, now.minute) >= MARKET_CLOSE_IST
+
+    def seconds_until_open(self):
+        """Seconds until today's 09:15 IST open, 0 once it has passed"""
+        now = datetime.now(IST)
+        market_open = now.replace(hour=MARKET_OPEN_IST[0], minute=MARKET_OPEN_IST[1], second=0, microsecond=0)
+        return max(0.0, (market_open - now).total_seconds())
+
+    def has_bars_today(self):
+        """Whether the chart feed has produced any bar dated today (IST)"""
+        today = datetime.now(IST).date()
+        return any(
+            window.last_timestamp is not None and datetime.fromtimestamp(window.last_timestamp, IST).date() == today
+            for window in self.aggregator.windows.values()
+        )
+
+    def run_intraday(self):
+        """Poll during market hours, updating the pinned report in place"""
+        if self.market_closed():
+            print("No trading session right now, skipping intraday updates.")
+            return
+        
+        wait_seconds = self.seconds_until_open()
+        if wait_seconds:
+            print(f"Waiting {wait_seconds / 60:.0f} min for the market to open...")
+            time.sleep(wait_seconds)
+        
+        print(f"Starting intraday updates every {INTRADAY_POLL_SECONDS}s until market close...")
+        session_start = time.monotonic()
+        
+        while True:
+            try:
+                run_deadline = Deadline(RUN_DEADLINE_SECONDS)
+                deadline = Deadline(max(0.0, RUN_DEADLINE_SECONDS - SEND_RESERVE_SECONDS))
+                results = self.fetch_sources(self.nifty_sources + MMI_SOURCES, deadline)
+                nifty_data = self.scrape_nifty_pe_data(results)
+                mmi_data = self.scrape_mmi_data(results)
+                self.apply_last_known_good(nifty_data, mmi_data)
+                
+                message = self.format_message(nifty_data, mmi_data)
+                self.send_telegram_report(message, mmi_data.get('status'), run_deadline)
+                
+            except Exception as e:
+                print(f"Intraday update failed with error: {e}")
+            
+            if self.market_closed():
+                print("Market closed, stopping intraday updates.")
+                break
+            
+            if time.monotonic() - session_start > HOLIDAY_GRACE_MINUTES * 60 and not self.has_bars_today():
+                print("No bars for today from the chart feed, market holiday? Stopping intraday updates.")
+                break
+            
+            time.sleep(INTRADAY_POLL_SECONDS)
 
 if __name__ == "__main__":
-    scraper = MarketDataScraper()
-    scraper.run()
+    intraday = '--intraday' in sys.argv or os.environ.get('MARKET_BOT_MODE') == 'intraday'
+    scraper = MarketDataScraper(intraday=intraday)
+    try:
+        if intraday:
+            scraper.run_intraday()
+        else:
+            scraper.run()
+    finally:
+        scraper.close()
@@ -0,0 +1,290 @@
+import json
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+from bs4 import BeautifulSoup
+
+# Source registry: name -> url, request timeout and the extractor that turns raw bytes into data.
+# Extractors are plain module-level functions so they can run in a process pool.
+SOURCES = {
+    'finlive': {
+        'url': "https://www.finlive.in/page/nifty-50-nifty-pe-ratio",
+        'timeout': 15,
+        'source': 'finlive.in',
+        'fields': ('pe_ratio',),
+    },
+    'trendlyne': {
+        'url': "https://trendlyne.com/equity/1887/NIFTY/nifty-50/",
+        'timeout': 15,
+        'source': 'trendlyne.com',
+        'fields': ('price', 'pe_ratio'),
+    },
+    'screener': {
+        'url': "https://www.screener.in/company/NIFTY/",
+        'timeout': 15,
+        'source': 'screener.in',
+        'fields': ('price', 'pe_ratio'),
+    },
+    'yahoo': {
+        'url': "https://query1.finance.yahoo.com/v8/finance/chart/^NSEI",
+        'timeout': 10,
+        'source': 'Yahoo Finance API',
+        'fields': ('price',),
+    },
+    'yahoo_intraday': {
+        'url': "https://query1.finance.yahoo.com/v8/finance/chart/^NSEI?interval=1m&range=1d",
+        'timeout': 10,
+        'source': 'Yahoo Finance API',
+        'fields': ('price',),
+    },
+    'tickertape': {
+        'url': "https://www.tickertape.in/market-mood-index",
+        'timeout': 15,
+        'source': 'tickertape.in',
+        'fields': ('value',),
+    },
+    'goodreturns': {
+        'url': "https://www.goodreturns.in/market-mood-index.html",
+        'timeout': 15,
+        'source': 'goodreturns.in',
+        'fields': ('value',),
+    },
+}
+
+FINLIVE_PE_PATTERN = re.compile(r'NIFTY 50 PE is ([\d.]+)')
+FINLIVE_PE_FALLBACK_PATTERNS = [
+    re.compile(r'PE.*?(\d+\.\d+)', re.IGNORECASE),
+    re.compile(r'P/E.*?(\d+\.\d+)', re.IGNORECASE),
+    re.compile(r'ratio.*?(\d+\.\d+)', re.IGNORECASE),
+]
+IST = timezone(timedelta(hours=5, minutes=30))
+BAR_SECONDS = 60
+
+DECIMAL_NUMBER_PATTERN = re.compile(r'[\d,]+\.\d+')
+INTEGER_PATTERN = re.compile(r'\d+')
+GOODRETURNS_MMI_PATTERNS = [
+    re.compile(r'MMI.*?(\d+)', re.IGNORECASE),
+    re.compile(r'Market Mood Index.*?(\d+)', re.IGNORECASE),
+    re.compile(r'Index.*?(\d+)', re.IGNORECASE),
+    re.compile(r'current.*?(\d+)', re.IGNORECASE),
+]
+
+
+def warm_up_worker():
+    """Process pool initializer: pay import and parser set-up costs once per worker"""
+    BeautifulSoup('<html></html>', 'html.parser')
+
+
+def error_result(name):
+    """Result returned when a source could not be fetched or parsed"""
+    result = {field: 'Error' for field in SOURCES[name]['fields']}
+    result['source'] = SOURCES[name]['source']
+    return result
+
+
+def parse_finlive(content):
+    """Extract NIFTY 50 PE from finlive.in"""
+    soup = BeautifulSoup(content, 'html.parser')
+
+    # Look for specific patterns in the text
+    page_text = soup.get_text()
+
+    # Extract PE ratio
+    pe_ratio = 'N/A'
+    pe_match = FINLIVE_PE_PATTERN.search(page_text)
+    if pe_match:
+        pe_ratio = pe_match.group(1)
+
+    # Try alternative PE patterns
+    if pe_ratio == 'N/A':
+        for pattern in FINLIVE_PE_FALLBACK_PATTERNS:
+            match = pattern.search(page_text)
+            if match:
+                pe_ratio = match.group(1)
+                break
+
+    return {'pe_ratio': pe_ratio, 'source': 'finlive.in'}
+
+
+def parse_trendlyne(content):
+    """Extract NIFTY 50 price and PE from Trendlyne"""
+    soup = BeautifulSoup(content, 'html.parser')
+
+    # Look for price and PE data
+    price = 'N/A'
+    pe_ratio = 'N/A'
+
+    # Try to find price elements
+    price_elements = soup.find_all(['span', 'div', 'td'], text=DECIMAL_NUMBER_PATTERN)
+    numbers = []
+
+    for element in price_elements:
+        try:
+            # Extract clean number
+            text = element.get_text().strip()
+            clean_num = re.sub(r'[^\d.]', '', text)
+            if '.' in clean_num and len(clean_num) > 3:
+                num = float(clean_num)
+                numbers.append(num)
+        except:
+            continue
+
+    # Heuristic: NIFTY price is usually above 20,000, PE is usually between 15-30
+    for num in numbers:
+        if 20000 <= num <= 30000 and price == 'N/A':
+            price = str(num)
+        elif 15 <= num <= 35 and pe_ratio == 'N/A':
+            pe_ratio = str(num)
+
+    return {'price': price, 'pe_ratio': pe_ratio, 'source': 'trendlyne.com'}
+
+
+def parse_screener(content):
+    """Extract NIFTY 50 price and PE from Screener.in"""
+    soup = BeautifulSoup(content, 'html.parser')
+
+    # Look for specific data fields
+    price = 'N/A'
+    pe_ratio = 'N/A'
+
+    # Try to find data in table rows
+    rows = soup.find_all('tr')
+    for row in rows:
+        cells = row.find_all(['td', 'th'])
+        if len(cells) >= 2:
+            header = cells[0].get_text().strip().lower()
+            value = cells[1].get_text().strip()
+
+            if 'price' in header or 'current' in header:
+                price_match = re.search(r'([\d,]+\.?\d*)', value)
+                if price_match:
+                    price = price_match.group(1).replace(',', '')
+
+            if 'pe' in header or 'p/e' in header:
+                pe_match = re.search(r'(\d+\.?\d*)', value)
+                if pe_match:
+                    pe_ratio = pe_match.group(1)
+
+    return {'price': price, 'pe_ratio': pe_ratio, 'source': 'screener.in'}
+
+
+def parse_yahoo(content):
+    """Extract NIFTY 50 price from the Yahoo Finance chart API"""
+    return _yahoo_price(json.loads(content))
+
+
+def _yahoo_price(data):
+    """Current price from a decoded Yahoo Finance chart response"""
+    if 'chart' in data and 'result' in data['chart'] and data['chart']['result']:
+        result = data['chart']['result'][0]
+
+        # Get current price
+        current_price = 'N/A'
+        if 'meta' in result and 'regularMarketPrice' in result['meta']:
+            current_price = str(round(result['meta']['regularMarketPrice'], 2))
+
+        return {'price': current_price, 'pe_ratio': 'N/A', 'source': 'Yahoo Finance API'}
+
+    return {'price': 'N/A', 'pe_ratio': 'N/A', 'source': 'Yahoo Finance API'}
+
+
+def parse_yahoo_chart(content):
+    """Extract NIFTY 50 price and today's completed 1-minute bars from the Yahoo Finance chart API
+
+    range=1d serves the previous session until today's first bar (and on
+    holidays), so bars not dated today in IST are dropped.
+    """
+    chart = json.loads(content)
+    data = _yahoo_price(chart)
+
+    results = chart.get('chart', {}).get('result') or []
+    if not results:
+        return data
+
+    result = results[0]
+    timestamps = result.get('timestamp') or []
+    quotes = (result.get('indicators', {}).get('quote') or [{}])[0]
+    columns = [quotes.get(key) or [] for key in ('open', 'high', 'low', 'close', 'volume')]
+
+    now = time.time()
+    today = datetime.now(IST).date()
+
+    bars = []
+    for i, timestamp in enumerate(timestamps):
+        # Skip the bar still forming and bars from earlier sessions
+        if timestamp + BAR_SECONDS > now or datetime.fromtimestamp(timestamp, IST).date() != today:
+            continue
+        bar = [column[i] if i < len(column) else None for column in columns]
+        if None in bar[:4]:
+            continue
+        bars.append((timestamp, *bar[:4], bar[4] or 0))
+
+    data['symbol'] = result.get('meta', {}).get('symbol', '^NSEI')
+    data['bars'] = bars
+    return data
+
+
+def parse_tickertape(content):
+    """Extract MMI from TickerTape"""
+    soup = BeautifulSoup(content, 'html.parser')
+
+    # Look for MMI value in various elements
+    mmi_value = 'N/A'
+
+    # Try to find MMI value in specific elements
+    mmi_elements = soup.find_all(['span', 'div', 'p'], text=INTEGER_PATTERN)
+
+    for element in mmi_elements:
+        try:
+            text = element.get_text().strip()
+            # Look for numbers between 0-100
+            numbers = re.findall(r'\b(\d+)\b', text)
+            for num in numbers:
+                value = int(num)
+                if 0 <= value <= 100:
+                    mmi_value = value
+                    break
+            if mmi_value != 'N/A':
+                break
+        except:
+            continue
+
+    return {'value': mmi_value, 'source': 'tickertape.in'}
+
+
+def parse_goodreturns(content):
+    """Extract MMI from GoodReturns"""
+    soup = BeautifulSoup(content, 'html.parser')
+
+    # Look for MMI value
+    mmi_value = 'N/A'
+
+    # Search for MMI value patterns
+    page_text = soup.get_text()
+
+    for pattern in GOODRETURNS_MMI_PATTERNS:
+        match = pattern.search(page_text)
+        if match:
+            value = int(match.group(1))
+            if 0 <= value <= 100:
+                mmi_value = value
+                break
+
+    return {'value': mmi_value, 'source': 'goodreturns.in'}
+
+
+PARSERS = {
+    'finlive': parse_finlive,
+    'trendlyne': parse_trendlyne,
+    'screener': parse_screener,
+    'yahoo': parse_yahoo,
+    'yahoo_intraday': parse_yahoo_chart,
+    'tickertape': parse_tickertape,
+    'goodreturns': parse_goodreturns,
+}
+
+
+def parse_source(name, content):
+    """Run the extractor for a source; used both in-process and in pool workers"""
+    return PARSERS[name](content)